@@ -1,52 +1,145 @@
 from __future__ import annotations
 
 import cv2
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
+from functools import cache
+from typing import cast
 import time
 import threading
 
-from camera import CameraStream, backend_from_name
+import numpy as np
+from numpy.typing import NDArray
+
+from camera import CameraStream, CaptureReactor, backend_from_name, map_output_fourcc
+from encoder import FrameWriter, nvenc_available, open_writer, writer_codec
 from logger import logger
 
+# 马赛克录制的最大画布尺寸（NVENC H.264 最大宽度 4096），超出时等比缩小每个子画面
+_MOSAIC_MAX_W = 3840
+_MOSAIC_MAX_H = 2160
+# 并发探测的线程上限：探测受驱动 I/O 限制，过多并发打开反而会让部分驱动串行化或报错
+_PROBE_WORKERS = 8
+# 马赛克子画面并行缩放的线程上限（cv2.resize 执行期间释放 GIL）
+_MOSAIC_RESIZE_WORKERS = 4
+# 上次探测结果缓存；设备节点未变化时跳过全量探测
+_DEVICE_CACHE = Path.home() / ".cache" / "opencam" / "devices.json"
+
+
+@cache
+def grid_shape(n: int) -> tuple[int, int]:
+    """Return (rows, cols) closest to a square for n tiles: cols=ceil(sqrt(n))."""
+    if n <= 0:
+        return 0, 0
+    cols = math.ceil(math.sqrt(n))
+    return math.ceil(n / cols), cols
+
+
+@cache
+def _label_sprite(text: str) -> NDArray[np.uint16]:
+    """Rasterize a tile label's anti-aliased coverage once, as an (H, W, 1) alpha mask.
+
+    Blending white text with this mask (dst += (255 - dst) * a / 255) reproduces
+    cv2.putText(..., LINE_AA) on any background, to within rounding.
+    """
+    font, scale, thickness = cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2
+    (tw, _th), baseline = cv2.getTextSize(text, font, scale, thickness)
+    # 与原 putText 位置一致：左上留 8px，基线位于 y=28
+    alpha = np.zeros((28 + baseline + thickness, 8 + tw + thickness), np.uint8)
+    _ = cv2.putText(alpha, text, (8, 28), font, scale, 255, thickness, cv2.LINE_AA)
+    # uint16 便于逐帧混合时直接相乘不溢出
+    sprite = alpha.astype(np.uint16)[:, :, None]
+    sprite.flags.writeable = False
+    return sprite
+
+
+# 单个 id（"3"）或闭区间（"0-2"，允许空白；反向区间自动交换）
+_MASK_RE = re.compile(r"(\d+)\s*(?:-\s*(\d+))?")
+
 
 def parse_device_mask(mask: str | None) -> list[int]:
-    if not mask:
-        return []
     ids: set[int] = set()
-    parts = [p.strip() for p in mask.split(",") if p.strip()]
-    for p in parts:
-        if "-" in p:
-            a, b = p.split("-", 1)
-            try:
-                start = int(a)
-                end = int(b)
-                if start <= end:
-                    ids.update(range(start, end + 1))
-                else:
-                    ids.update(range(end, start + 1))
-            except ValueError:
-                continue
-        else:
-            try:
-                ids.add(int(p))
-            except ValueError:
-                continue
+    for m in _MASK_RE.finditer(mask or ""):
+        a = int(m.group(1))
+        b = int(m.group(2) or a)
+        lo, hi = (a, b) if a <= b else (b, a)
+        ids.update(range(lo, hi + 1))
     return sorted(ids)
 
 
+def _probe_index(i: int, backend_flag: int) -> bool:
+    cap = cv2.VideoCapture(i, backend_flag)
+    ok = bool(cap and cap.isOpened())
+    if cap:
+        cap.release()
+    return ok
+
+
+def _device_signature(backend: str, max_devices: int) -> str | None:
+    """Hash the OS video device nodes; None where they cannot be enumerated (non-Linux)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    nodes = sorted(str(p) for p in Path("/dev").glob("video*"))
+    key = "\n".join([backend, str(max_devices), *nodes])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _load_device_cache(sig: str) -> list[int] | None:
+    try:
+        data = json.loads(_DEVICE_CACHE.read_text(encoding="utf-8"))  # pyright: ignore[reportAny]
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("sig") != sig:  # pyright: ignore[reportUnknownMemberType]
+        return None
+    indices = data.get("indices")  # pyright: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    if not isinstance(indices, list) or not all(isinstance(i, int) for i in indices):  # pyright: ignore[reportUnknownVariableType]
+        return None
+    return cast(list[int], indices)
+
+
+def _save_device_cache(sig: str, backend_flag: int, indices: list[int]) -> None:
+    try:
+        _DEVICE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        _ = _DEVICE_CACHE.write_text(
+            json.dumps({"sig": sig, "backend": backend_flag, "indices": indices}),
+            encoding="utf-8",
+        )
+    except OSError as e:
+        logger.debug(f"Device cache not written: {e}")
+
+
 def discover_devices(backend: str, max_devices: int, mask: str | None) -> list[int]:
     ids = parse_device_mask(mask)
     if ids:
         return ids
-    # Fallback: scan from 0..max_devices-1
-    found: list[int] = []
+    # Fallback: scan 0..max_devices-1；每次打开可能阻塞数百毫秒，并发探测使总耗时取决于最慢的设备
     backend_flag = backend_from_name(backend)
-    for i in range(max(0, max_devices)):
-        cap = cv2.VideoCapture(i, backend_flag)
-        if cap and cap.isOpened():
-            found.append(i)
-            cap.release()
+    sig = _device_signature(backend, max_devices)
+    if sig is not None:
+        cached = _load_device_cache(sig)
+        # 命中缓存时只打开第一个设备做冒烟验证，失败则回退全量探测
+        if cached and _probe_index(cached[0], backend_flag):
+            logger.info(f"Using cached device list {cached}")
+            return cached
+
+    def _probe(i: int) -> int | None:
+        return i if _probe_index(i, backend_flag) else None
+
+    n = max(0, max_devices)
+    if n == 0:
+        return []
+    workers = min(n, _PROBE_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ProbeCam") as pool:
+        found = [i for i in pool.map(_probe, range(n)) if i is not None]
+    if sig is not None and found:
+        _save_device_cache(sig, backend_flag, found)
     return found
 
 
@@ -62,6 +155,28 @@ class AppConfig:
     max_devices: int = 4
     # 摄像头状态周期日志间隔（秒）；0 表示禁用周期日志
     status_log_interval_sec: float = 0.0
+    # OpenCV 内部并行线程数：每路相机已有独立线程，默认 1 避免 N×CPU 个线程互相争抢。
+    # 代价是单路 VideoWriter 编码变为单线程，但多路相机本身即提供并行度
+    cv_threads: int = 1
+    # mp4 录制优先使用硬件编码：NVENC（ffmpegcv）> ffmpeg 管道（NVENC/VAAPI/VideoToolbox），不可用时回退 cv2.VideoWriter
+    use_hw_encoder: bool = True
+    nvenc_preset: str = "p4"
+    # avi 录制且相机输出 MJPG（V4L2）时，JPEG 数据直接封装进 AVI，不解码/不重编码（需 PyAV）
+    mjpeg_passthrough: bool = False
+    # 每路相机 采集->编码 队列深度（帧）；编码跟不上时丢弃新帧并计入 dropped 统计
+    record_queue_size: int = 4
+    # 打开相机时请求硬件解码（OpenCV 4.5.2+，主要对 FFmpeg/MSMF 后端的压缩流有效）
+    hw_decode: bool = False
+    # 多路相机时拼接为一个马赛克画面，只用一个编码会话写入单个文件（替代每路独立录制）
+    tiled_record: bool = False
+    # 预览缩放使用双线性平滑（较慢）；默认最近邻
+    smooth_preview: bool = False
+    # 由单个 asyncio 事件循环线程驱动所有相机，阻塞读帧在共享线程池中执行（替代每路一个线程）；
+    # capture_workers 为线程池大小，0 表示相机数的一半（向上取整）；小于相机数时各路相机轮流读帧，单路帧率会下降
+    async_capture: bool = False
+    capture_workers: int = 0
+    # 每路相机采集线程绑定到不同 CPU 核（仅 Linux，--async-capture 时忽略）；第一个核留给 UI 线程
+    pin_cpus: bool = False
 
 
 class MultiCamApp:
@@ -69,6 +184,19 @@ class MultiCamApp:
         self.cfg: AppConfig = cfg
         self.cams: list[CameraStream] = []
         self.recording_session_ts: str | None = None
+        self.reactor: CaptureReactor | None = None
+        # 马赛克录制状态
+        self._mosaic_writer: FrameWriter | None = None
+        self._mosaic_codec: str = ""
+        self._mosaic_thread: threading.Thread | None = None
+        self._mosaic_stop: threading.Event = threading.Event()
+        self._mosaic_frames: int = 0
+        self._mosaic_path: Path | None = None
+        # 马赛克画布按尺寸复用：各子画面由 cv2.resize 直接写入对应切片
+        self._mosaic_canvas: NDArray[np.uint8] | None = None
+        self._mosaic_pool: ThreadPoolExecutor | None = None
+        # 每个子画面上次合成时的帧序号；序号未变的子画面保持画布上的旧内容
+        self._mosaic_seqs: list[int] = []
         # UI 由上层 Qt 托管，这里不再维护自定义排布状态
 
     def setup(self) -> bool:
@@ -79,10 +207,35 @@ class MultiCamApp:
             logger.error("No cameras found. Check device_mask or increase max_devices.")
             return False
         logger.info(f"Discovered cameras: {ids}")
+        cv2.setNumThreads(self.cfg.cv_threads)
+        if self.cfg.use_hw_encoder:
+            # 硬件编码器探测（ffmpeg -encoders + 每个候选试编码一帧）可能耗时数秒，
+            # 在后台预热缓存，避免首次开始录制时阻塞 GUI 线程
+            threading.Thread(
+                target=nvenc_available, name="ProbeHwEncoder", daemon=True
+            ).start()
+        if self.cfg.async_capture:
+            # 默认线程数为相机数的一半（向上取整），总线程数少于每路一个线程的模式；
+            # 代价是每次读帧阻塞约一个帧周期，各路相机轮流读帧，单路帧率约降为 workers/相机数
+            workers = self.cfg.capture_workers or (len(ids) + 1) // 2
+            if workers < len(ids):
+                logger.info(
+                    f"Async capture: {workers} read worker(s) for {len(ids)} cameras; per-camera frame rate drops to about {workers / len(ids):.0%} of the source rate"
+                )
+            self.reactor = CaptureReactor(workers)
+
+        cpus: list[int] = []
+        if self.cfg.pin_cpus and not self.cfg.async_capture:
+            if hasattr(os, "sched_getaffinity"):
+                cpus = sorted(os.sched_getaffinity(0))
+            else:
+                logger.warning(
+                    "CPU pinning is only supported on Linux; ignoring --pin-cpus"
+                )
 
         # 并行启动打开摄像头，避免慢设备阻塞整体启动
         open_threads: list[threading.Thread] = []
-        for did in ids:
+        for i, did in enumerate(ids):
             cam = CameraStream(
                 did,
                 self.cfg.backend,
@@ -90,10 +243,22 @@ class MultiCamApp:
                 self.cfg.height,
                 self.cfg.fps,
                 self.cfg.status_log_interval_sec,
+                use_hw_encoder=self.cfg.use_hw_encoder,
+                nvenc_preset=self.cfg.nvenc_preset,
+                mjpeg_passthrough=self.cfg.mjpeg_passthrough,
+                record_queue_size=self.cfg.record_queue_size,
+                hw_decode=self.cfg.hw_decode,
+                # 跳过第一个可用核（UI 线程），相机多于核数时循环分配
+                pin_cpu=cpus[(i + 1) % len(cpus)] if cpus else None,
             )
             # 先加入列表，未打开前会显示占位
             self.cams.append(cam)
-            t = threading.Thread(target=cam.open, name=f"OpenCam-{did}", daemon=True)
+            t = threading.Thread(
+                target=cam.open,
+                args=(self.reactor,),
+                name=f"OpenCam-{did}",
+                daemon=True,
+            )
             t.start()
             open_threads.append(t)
 
@@ -112,10 +277,162 @@ class MultiCamApp:
 
     def start_recording_all(self) -> None:
         session_dir = self._make_session_dir()
+        if self.cfg.tiled_record and len(self.cams) > 1:
+            self._start_mosaic_recording(session_dir)
+            return
         for cam in self.cams:
             base_name = f"cam{cam.device_id}_{self.recording_session_ts}"
             cam.start_recording(session_dir / base_name, self.cfg.output_type)
 
     def stop_recording_all(self) -> None:
+        self._stop_mosaic_recording()
         for cam in self.cams:
             cam.stop_recording()
+
+    def is_mosaic_recording(self) -> bool:
+        """Return True while the tiled mosaic recorder is writing (it exits on write failure)."""
+        t = self._mosaic_thread
+        return t is not None and t.is_alive()
+
+    def _mosaic_tile_size(self, rows: int, cols: int) -> tuple[int, int]:
+        w, h = self.cfg.width, self.cfg.height
+        scale = min(1.0, _MOSAIC_MAX_W / (cols * w), _MOSAIC_MAX_H / (rows * h))
+        # 偶数宽高便于 yuv420 编码
+        return max(2, int(w * scale) // 2 * 2), max(2, int(h * scale) // 2 * 2)
+
+    def _compose_mosaic(self) -> NDArray[np.uint8]:
+        """Return the latest frames of all cameras tiled into one BGR image.
+
+        Tiles follow camera order in a near-square grid (see grid_shape); cameras
+        without a frame yet stay black. The returned canvas is reused by the next
+        call, so consume it (e.g. writer.write) before composing again. Tiles whose
+        camera has not published a new frame since the last call are left as is.
+
+        Only the mosaic recording thread may call this: the canvas, per-tile seqs
+        and resize pool are its unguarded state.
+        """
+        rows, cols = grid_shape(len(self.cams))
+        tw, th = self._mosaic_tile_size(rows, cols)
+        shape = (rows * th, cols * tw, 3)
+        canvas = self._mosaic_canvas
+        if canvas is None or canvas.shape != shape:
+            canvas = np.zeros(shape, dtype=np.uint8)
+            self._mosaic_canvas = canvas
+            # 序号 0 即尚无帧：新画布本就全黑，空白子画面无需再清零
+            self._mosaic_seqs = [0] * len(self.cams)
+        seqs = self._mosaic_seqs
+        tiles: list[tuple[int, NDArray[np.uint8], NDArray[np.uint8]]] = []
+        for i, cam in enumerate(self.cams):
+            seq, frame = cam.get_latest_frame_with_seq()
+            if seq == seqs[i] or frame is None:
+                continue
+            seqs[i] = seq
+            r, c = divmod(i, cols)
+            tile = canvas[r * th : (r + 1) * th, c * tw : (c + 1) * tw]
+            tiles.append((cam.device_id, frame, tile))
+        pool = self._mosaic_pool
+        if pool is None or len(tiles) < 2:
+            for device_id, frame, tile in tiles:
+                self._compose_tile(device_id, frame, tile)
+        else:
+            # 各子画面写入互不重叠的切片，可并行缩放；等待全部完成后再交给编码器
+            futures = [pool.submit(self._compose_tile, *t) for t in tiles]
+            for f in futures:
+                f.result()
+        return canvas
+
+    @staticmethod
+    def _compose_tile(
+        device_id: int, frame: NDArray[np.uint8], tile: NDArray[np.uint8]
+    ) -> None:
+        th, tw = tile.shape[:2]
+        if frame.shape[:2] == (th, tw):
+            # 尺寸一致时直接拷贝，跳过 resize 的重采样
+            np.copyto(tile, frame)
+        else:
+            _ = cv2.resize(frame, (tw, th), dst=tile, interpolation=cv2.INTER_AREA)
+        # 标签覆盖率只栅格化一次，之后每帧按 alpha 混合白字，不再逐帧渲染字体
+        alpha = _label_sprite(f"cam{device_id}")
+        sh, sw = min(alpha.shape[0], th), min(alpha.shape[1], tw)
+        region = tile[:sh, :sw]
+        r = region.astype(np.uint16)
+        r += ((255 - r) * alpha[:sh, :sw] + 127) // 255
+        region[...] = r
+
+    def _start_mosaic_recording(self, session_dir: Path) -> None:
+        self._stop_mosaic_recording()
+        rows, cols = grid_shape(len(self.cams))
+        tw, th = self._mosaic_tile_size(rows, cols)
+        size = (cols * tw, rows * th)
+        fourcc_str, ext = map_output_fourcc(self.cfg.output_type)
+        path = session_dir / f"mosaic_{self.recording_session_ts}{ext}"
+        opened = open_writer(
+            path,
+            fourcc_str,
+            self.cfg.fps,
+            size,
+            use_hw_encoder=self.cfg.use_hw_encoder,
+            nvenc_preset=self.cfg.nvenc_preset,
+        )
+        if opened is None:
+            logger.error(f"Mosaic: failed to open VideoWriter at {path}")
+            return
+        writer, codec = opened
+        self._mosaic_writer = writer
+        self._mosaic_codec = codec
+        self._mosaic_path = path
+        self._mosaic_frames = 0
+        self._mosaic_stop.clear()
+        self._mosaic_pool = ThreadPoolExecutor(
+            max_workers=min(len(self.cams), _MOSAIC_RESIZE_WORKERS),
+            thread_name_prefix="MosaicResize",
+        )
+        self._mosaic_thread = threading.Thread(
+            target=self._mosaic_loop, args=(writer,), name="MosaicRecorder", daemon=True
+        )
+        self._mosaic_thread.start()
+        logger.info(
+            f"Mosaic: start recording {len(self.cams)} camera(s) -> {path.name} fourcc={codec} size={size[0]}x{size[1]}@{self.cfg.fps:.2f}"
+        )
+
+    def _mosaic_loop(self, writer: FrameWriter) -> None:
+        # 按目标帧率定时取各路最新帧拼接并写入；落后时不追帧
+        period = 1.0 / self.cfg.fps if self.cfg.fps > 0 else 1.0 / 30.0
+        next_t = time.monotonic()
+        while not self._mosaic_stop.is_set():
+            try:
+                _ = writer.write(self._compose_mosaic())
+                self._mosaic_frames += 1
+            except Exception as e:
+                logger.warning(
+                    f"Mosaic: writer.write failed ({e}); stopping mosaic recording"
+                )
+                break
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                _ = self._mosaic_stop.wait(delay)
+            else:
+                next_t = time.monotonic()
+
+    def _stop_mosaic_recording(self) -> None:
+        if self._mosaic_thread is None:
+            return
+        self._mosaic_stop.set()
+        self._mosaic_thread.join()
+        self._mosaic_thread = None
+        if self._mosaic_pool is not None:
+            self._mosaic_pool.shutdown()
+            self._mosaic_pool = None
+        codec = self._mosaic_codec
+        if self._mosaic_writer is not None:
+            codec = writer_codec(self._mosaic_writer, codec)
+            try:
+                self._mosaic_writer.release()
+            finally:
+                self._mosaic_writer = None
+        file_name = self._mosaic_path.name if self._mosaic_path else "<unknown>"
+        logger.info(
+            f"Mosaic: stop recording | file={file_name} frames={self._mosaic_frames} fourcc={codec}"
+        )
+        self._mosaic_path = None
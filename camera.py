@@ -1,27 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import cv2
+import os
+import queue
 import time
-from threading import Event, Thread, Lock
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from threading import Event, Thread, Lock, current_thread
 from pathlib import Path
 import numpy as np
 from loguru import logger
 from numpy.typing import NDArray
-from typing import cast
+from typing import Callable, cast
+
+from encoder import FrameWriter, open_passthrough_writer, open_writer, writer_codec
+
+# 落后时单次最多丢弃的积压帧数，避免 grab() 长时间阻塞
+_MAX_DRAIN_FRAMES = 4
+# 采集线程 -> 编码线程的默认队列深度；满时丢帧而不是阻塞采集
+_ENCODER_QUEUE_SIZE = 4
+# 采集循环计时统一用单调时钟整数纳秒，避免墙钟跳变影响 dt
+_mono = time.monotonic_ns
+# 读帧失败时指数退避重试（1ms 起，上限 20ms），持续失败超过该时长才停止采集
+_READ_BACKOFF_MIN_S = 0.001
+_READ_BACKOFF_MAX_S = 0.02
+_READ_FAIL_TIMEOUT_NS = 2_000_000_000
+# close() 等待采集循环退出的上限（秒）；单次读帧阻塞更久时放弃等待
+_CLOSE_JOIN_TIMEOUT_S = 1.0
+_NS_PER_SEC = 1_000_000_000
+_Q16_ONE = 1 << 16
+
+
+_BACKENDS: dict[str, int] = {
+    "ANY": cv2.CAP_ANY,
+    "AUTO": cv2.CAP_ANY,
+    "DEFAULT": cv2.CAP_ANY,
+    "MSMF": cv2.CAP_MSMF,
+    "CAP_MSMF": cv2.CAP_MSMF,
+    "DSHOW": cv2.CAP_DSHOW,
+    "DIRECTSHOW": cv2.CAP_DSHOW,
+    "CAP_DSHOW": cv2.CAP_DSHOW,
+    "V4L2": cv2.CAP_V4L2,
+    "CAP_V4L2": cv2.CAP_V4L2,
+}
 
 
 def backend_from_name(name: str) -> int:
-    name_u = name.strip().upper()
-    if name_u in ("ANY", "AUTO", "DEFAULT"):
-        return cv2.CAP_ANY
-    if name_u in ("MSMF", "CAP_MSMF"):
-        return cv2.CAP_MSMF
-    if name_u in ("DSHOW", "DIRECTSHOW", "CAP_DSHOW"):
-        return cv2.CAP_DSHOW
-    if name_u in ("V4L2", "CAP_V4L2"):
-        return cv2.CAP_V4L2
-    # Fallback
-    return cv2.CAP_ANY
+    # 未知名称回退到 CAP_ANY
+    return _BACKENDS.get(name.strip().upper(), cv2.CAP_ANY)
 
 
 def map_output_fourcc(output_type: str) -> tuple[str, str]:
@@ -35,6 +61,13 @@ def map_output_fourcc(output_type: str) -> tuple[str, str]:
 
 
 class CameraStream:
+    """One camera: capture loop, latest-frame publication and optional recording.
+
+    open() requests MJPG and a one-frame driver buffer (CAP_PROP_BUFFERSIZE=1) so
+    reads return the newest frame instead of one queued ~4 frames ago; backends
+    that ignore the buffer size are caught up by draining stale frames with grab().
+    """
+
     def __init__(
         self,
         device_id: int,
@@ -43,32 +76,85 @@ class CameraStream:
         height: int = 1080,
         fps: float = 30.0,
         status_log_interval_sec: float = 0.0,
+        use_hw_encoder: bool = False,
+        nvenc_preset: str = "p4",
+        mjpeg_passthrough: bool = False,
+        record_queue_size: int = _ENCODER_QUEUE_SIZE,
+        hw_decode: bool = False,
+        pin_cpu: int | None = None,
     ) -> None:
         self.device_id: int = device_id
         self.backend_flag: int = backend_from_name(backend_name)
         self.width: int = int(width)
         self.height: int = int(height)
         self.fps: float = float(fps)
-        self._status_log_interval: float = float(status_log_interval_sec)
+        # 打开后读取一次相机实际协商的帧率（驱动可能不接受请求值）；录制与丢帧判断均使用该值
+        self._effective_fps: float = self.fps
+        self._frame_period_ns: int = 0
+        # 相机实际帧率明显高于目标帧率时，两次 retrieve() 的最小间隔；0 表示不限速
+        self._retrieve_gap_ns: int = 0
+        self._last_retrieve_ns: int = 0
+        self._status_log_interval_ns: int = int(
+            float(status_log_interval_sec) * _NS_PER_SEC
+        )
+        self.use_hw_encoder: bool = bool(use_hw_encoder)
+        self.nvenc_preset: str = nvenc_preset
+        self.mjpeg_passthrough: bool = bool(mjpeg_passthrough)
+        # 深度越大越能吸收编码抖动，但每帧占用一份完整帧内存
+        self.record_queue_size: int = max(1, int(record_queue_size))
+        # 打开时请求硬件解码（NVDEC/VAAPI/D3D11 等）；对不支持的后端/格式无影响
+        self.hw_decode: bool = bool(hw_decode)
+        # 采集线程绑定的 CPU 核（仅 Linux、独立线程模式）；None 表示不绑定
+        self.pin_cpu: int | None = pin_cpu
+        # MJPG 直通录制期间关闭 CONVERT_RGB，retrieve() 返回未解码的 JPEG 数据。
+        # VideoCapture 非线程安全（V4L2 切换该属性会重建缓冲），因此 UI 线程只写入期望状态
+        # _want_raw，由采集线程在两次读帧之间实际切换
+        self._raw_capture: bool = False
+        self._want_raw: bool = False
 
         self.cap: cv2.VideoCapture | None = None
-        self.writer: cv2.VideoWriter | None = None
+        # 打开后后端名称不再变化，缓存以免在采集循环中反复查询
+        self._backend_name: str = str(self.backend_flag)
+        self.writer: FrameWriter | None = None
         self.recording: Event = Event()
         self.running: Event = Event()
 
-        self._frame_lock: Lock = Lock()
-        self._frame: NDArray[np.uint8] | None = None
-        # Frame sequence and FPS/status fields
-        self._frame_seq: int = 0
-        self._last_frame_time: float = 0.0
-        self._fps_ema: float = 0.0
-        self._ema_alpha: float = 0.2  # smoothing factor for FPS EMA
+        # 最新帧以 (seq, frame) 整体发布：单次属性赋值在 GIL 下是原子的，
+        # 读端既不需要加锁也不需要拷贝；帧发布后只读，不会被采集线程复用
+        self._published: tuple[int, NDArray[np.uint8] | None] = (0, None)
+        # FPS/status fields
+        # FPS EMA 使用 Q16 定点整数运算，仅在 get_status 中转换为浮点。
+        # 以下字段只由采集线程写入（单次属性赋值），get_status 无锁读取，采集线程从不等待 UI
+        self._last_frame_ns: int = 0
+        self._fps_ema_q16: int = 0
+        self._ema_alpha_q16: int = round(0.2 * _Q16_ONE)  # smoothing factor for FPS EMA
         self._last_frame_size: tuple[int, int] | None = None  # (w, h)
+        # 采集线程缓存的帧尺寸 (h, w)；固定模式相机上极少变化，仅在变化时刷新 _last_frame_size
+        self._frame_hw: tuple[int, int] = (0, 0)
         self._writer_lock: Lock = Lock()
-        self._last_log_time: float = 0.0
+        self._last_log_ns: int = 0
         self._frame_count: int = 0
-        self._start_time: float = 0.0
+        self._start_ns: int = 0
+        # 最近一次读帧完成时间，以及为追上最新帧而丢弃的帧数
+        self._last_read_ns: int = 0
+        self._dropped_frames: int = 0
+        # 仅当后端未接受 BUFFERSIZE=1（驱动仍积压多帧）时才丢弃旧帧；
+        # 只缓冲 1 帧时多余的 grab() 会阻塞等待新帧，反而增加延迟并被误计为丢帧
+        self._drain_stale: bool = False
+        # 连续读帧失败的起始时刻（0 表示当前正常）与下一次退避时长
+        self._read_fail_ns: int = 0
+        self._read_backoff_s: float = _READ_BACKOFF_MIN_S
+        # UI（或其他消费者）取走最新帧后置位；未置位且不录制时采集线程只 grab() 不解码
+        self._ui_needs_frame: Event = Event()
+        self._ui_needs_frame.set()
+        # 独占线程时空闲帧在 _read_latest 内连续 grab；由 CaptureReactor 驱动时每次只 grab 一帧，
+        # 以免空闲相机长期占用共享的执行器线程
+        self._coalesce_idle: bool = True
+        # 新帧发布后在采集线程中回调（参数为 device_id），供 UI 改为按帧到达驱动刷新；须快速返回
+        self.on_frame: Callable[[int], None] | None = None
         self._thread: Thread | None = None
+        # CaptureReactor 模式下采集协程对应的 future，close() 时据此等待其退出
+        self._capture_future: Future[None] | None = None
 
         self._out_fourcc_str: str = "MJPG"
         self._out_ext: str = ".avi"
@@ -77,37 +163,97 @@ class CameraStream:
         self._rec_frame_count: int = 0
         self._rec_output_path: Path | None = None
         self._rec_size: tuple[int, int] | None = None
+        # 编码在独立线程中进行，采集线程只负责入队
+        self._write_q: queue.Queue[NDArray[np.uint8] | None] | None = None
+        self._encoder_thread: Thread | None = None
+        self._dropped_enc: int = 0
 
-    def open(self) -> bool:
-        self.cap = cv2.VideoCapture(self.device_id, self.backend_flag)
+    def open(self, reactor: CaptureReactor | None = None) -> bool:
+        """Open the device and start capturing on a dedicated thread, or on reactor if given."""
+        if self.backend_flag == cv2.CAP_MSMF:
+            # MSMF 同步读在录制负载下会累积延迟；异步模式下后端自行丢弃旧帧，只交付最新帧。
+            # 该开关需在构造 VideoCapture 前通过环境变量设置（仅对按索引打开的摄像头生效）
+            _ = os.environ.setdefault("OPENCV_VIDEOIO_MSMF_ENABLE_ASYNC", "1")
+        # 旧版 OpenCV（< 4.5.2）没有硬件加速相关常量，此时按普通方式打开
+        accel_prop = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+        accel_any = getattr(cv2, "VIDEO_ACCELERATION_ANY", None)
+        hw_accel_prop: int | None = None
+        if (
+            self.hw_decode
+            and isinstance(accel_prop, int)
+            and isinstance(accel_any, int)
+        ):
+            hw_accel_prop = accel_prop
+            # 硬件加速只能在打开时通过参数请求，打开后再 set() 不生效
+            self.cap = cv2.VideoCapture(
+                self.device_id, self.backend_flag, [hw_accel_prop, accel_any]
+            )
+        else:
+            self.cap = cv2.VideoCapture(self.device_id, self.backend_flag)
         if not self.cap or not self.cap.isOpened():
             logger.error(f"Camera {self.device_id}: failed to open")
             return False
+        msmf_async_prop = getattr(cv2, "CAP_PROP_MSMF_ENABLE_ASYNC", None)
+        if self.backend_flag == cv2.CAP_MSMF and isinstance(msmf_async_prop, int):
+            # 新版 OpenCV 提供专用属性时直接设置
+            _ = self.cap.set(msmf_async_prop, 1)
 
         # Configure capture for performance similar to demo
         _ = self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc(*"MJPG"))
         _ = self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         _ = self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         _ = self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # 驱动缓冲仅保留 1 帧（V4L2 默认 4 帧），降低端到端延迟
+        self._drain_stale = not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if self._drain_stale:
+            # 部分后端不支持该属性；读循环的落后丢帧逻辑仍会跳过积压帧
+            logger.info(
+                f"Camera {self.device_id}: backend ignored CAP_PROP_BUFFERSIZE=1; relying on frame draining"
+            )
 
         # 预热：读取少量帧帮助后端稳定，减少首帧延迟
         warm_reads = 3
         for _i in range(warm_reads):
             _ret, _frm = self.cap.read()
 
-        backend_name = (
+        self._backend_name = (
             self.cap.getBackendName()
             if hasattr(self.cap, "getBackendName")
             else str(self.backend_flag)
         )
+        reported_fps = float(self.cap.get(cv2.CAP_PROP_FPS))
+        # 部分后端返回 0 或 NaN（比较均为 False），此时沿用请求的帧率
+        self._effective_fps = reported_fps if reported_fps > 0 else self.fps
+        self._frame_period_ns = (
+            int(_NS_PER_SEC / self._effective_fps) if self._effective_fps > 0 else 0
+        )
+        if self.fps > 0 and self._effective_fps > 1.2 * self.fps:
+            # 只解码目标帧率所需的帧，其余仅 grab()；减去半个相机帧周期以免与帧到达时刻拍频
+            self._retrieve_gap_ns = (
+                int(_NS_PER_SEC / self.fps) - self._frame_period_ns // 2
+            )
+            # 录制按目标帧率写入
+            self._effective_fps = self.fps
+        if hw_accel_prop is not None:
+            logger.info(
+                f"Camera {self.device_id}: hw decode acceleration={int(self.cap.get(hw_accel_prop))}"
+            )
+        elif self.hw_decode:
+            logger.warning(
+                f"Camera {self.device_id}: this OpenCV build has no hardware decode properties; ignoring --hw-decode"
+            )
         logger.info(
-            f"Camera {self.device_id}: opened with backend={backend_name}, target={self.width}x{self.height}@{self.fps:.2f}"
+            f"Camera {self.device_id}: opened with backend={self._backend_name}, target={self.width}x{self.height}@{self.fps:.2f}, reported fps={reported_fps:.2f}"
         )
 
         self.running.set()
-        self._start_time = time.time()
-        self._last_log_time = self._start_time
+        self._start_ns = _mono()
+        self._last_log_ns = self._start_ns
         self._frame_count = 0
+        if reactor is not None:
+            self._coalesce_idle = False
+            self._capture_future = reactor.add(self)
+            return True
         self._thread = Thread(
             target=self._loop, name=f"CameraStream-{self.device_id}", daemon=True
         )
@@ -126,46 +272,87 @@ class CameraStream:
 
         w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) if self.cap else self.width
         h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) if self.cap else self.height
-        fourcc = cv2.VideoWriter.fourcc(*fourcc_str)
-        new_writer = cv2.VideoWriter(str(output_path), fourcc, self.fps, (w, h))
-        if new_writer and new_writer.isOpened():
+        opened = None
+        passthrough = (
+            self.mjpeg_passthrough
+            and output_type.lower() == "avi"
+            and self._capture_is_v4l2_mjpg()
+        )
+        if passthrough:
+            opened = open_passthrough_writer(output_path, self._effective_fps, (w, h))
+            passthrough = opened is not None
+        if opened is None:
+            opened = open_writer(
+                output_path,
+                fourcc_str,
+                self._effective_fps,
+                (w, h),
+                use_hw_encoder=self.use_hw_encoder,
+                nvenc_preset=self.nvenc_preset,
+            )
+        if opened is not None:
+            new_writer, codec = opened
+            write_q: queue.Queue[NDArray[np.uint8] | None] = queue.Queue(
+                maxsize=self.record_queue_size
+            )
+            enc_thread = Thread(
+                target=self._encoder_loop,
+                args=(new_writer, write_q),
+                name=f"CameraEncoder-{self.device_id}",
+                daemon=True,
+            )
             with self._writer_lock:
                 self.writer = new_writer
+                self._out_fourcc_str = codec
                 # 初始化录制统计
                 self._rec_start_time = time.time()
                 self._rec_frame_count = 0
+                self._dropped_enc = 0
                 self._rec_output_path = output_path
                 self._rec_size = (w, h)
-                # 录制开始时重置 FPS 估计，仅在录制期间计算
-                with self._frame_lock:
-                    self._fps_ema = 0.0
-                    self._last_frame_time = 0.0
+                self._write_q = write_q
+                self._encoder_thread = enc_thread
+                enc_thread.start()
+                # 录制开始时重置 FPS 估计；recording 尚未置位，采集线程此时不会更新 EMA
+                self._fps_ema_q16 = 0
+                self._last_frame_ns = 0
                 self.recording.set()
+            if passthrough:
+                # JPEG 数据原样写入 AVI，跳过 解码->BGR->再编码 两次编解码；切换前到达的 BGR 帧由写入器编码为 JPEG
+                self._want_raw = True
             logger.info(
-                f"Camera {self.device_id}: start recording -> {output_path.name} fourcc={fourcc_str} size={w}x{h}@{self.fps:.2f}"
+                f"Camera {self.device_id}: start recording -> {output_path.name} fourcc={codec} size={w}x{h}@{self._effective_fps:.2f}"
             )
         else:
             logger.error(
                 f"Camera {self.device_id}: failed to open VideoWriter at {output_path}"
             )
-            try:
-                if new_writer:
-                    new_writer.release()
-            finally:
-                pass
 
     def stop_recording(self) -> None:
         # 先清除录制标志，阻止新的写入
         was_recording = self.recording.is_set()
         if was_recording:
             self.recording.clear()
-        # 在写锁下安全释放 writer，避免与写入竞争
         with self._writer_lock:
-            if self.writer:
+            write_q, enc_thread = self._write_q, self._encoder_thread
+            self._write_q = None
+            self._encoder_thread = None
+        # 通知编码线程写完队列中剩余帧后退出；若其已因写入失败退出则不再等待
+        if write_q is not None and enc_thread is not None:
+            while enc_thread.is_alive():
                 try:
-                    self.writer.release()
-                finally:
-                    self.writer = None
+                    write_q.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            enc_thread.join()
+        self._want_raw = False
+        # writer 归编码线程所有，由其退出时释放；这里只清理引用
+        with self._writer_lock:
+            writer, self.writer = self.writer, None
+        if writer is not None:
+            # 硬件编码器启动失败回退到 cv2 时，统计中显示实际使用的编码器
+            self._out_fourcc_str = writer_codec(writer, self._out_fourcc_str)
         if was_recording:
             # 汇总并输出录制统计
             duration = (
@@ -183,7 +370,8 @@ class CameraStream:
             logger.info(
                 (
                     f"Camera {self.device_id}: stop recording | file={file_name} "
-                    f"frames={self._rec_frame_count} duration={duration:.2f}s avg_fps={avg_fps:.2f} "
+                    f"frames={self._rec_frame_count} dropped={self._dropped_enc} "
+                    f"duration={duration:.2f}s avg_fps={avg_fps:.2f} "
                     f"size={width}x{height} fourcc={self._out_fourcc_str}"
                 )
             )
@@ -193,97 +381,317 @@ class CameraStream:
             self._rec_output_path = None
             self._rec_size = None
 
+    def _capture_is_v4l2_mjpg(self) -> bool:
+        # 仅 V4L2 在 CONVERT_RGB=0 时对 MJPG 稳定返回完整 JPEG 数据
+        if self.cap is None or self._backend_name.upper() != "V4L2":
+            return False
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        return fourcc == cv2.VideoWriter.fourcc(*"MJPG")
+
     def get_latest_frame_with_seq(self) -> tuple[int, NDArray[np.uint8] | None]:
-        """Return (sequence, latest_frame_copy). Sequence increases when a new frame is captured."""
-        with self._frame_lock:
-            seq = self._frame_seq
-            frm = None if self._frame is None else self._frame.copy()
-            return seq, frm
+        """Return (sequence, latest_frame). Sequence increases when a new frame is captured.
+
+        The frame is shared with the capture thread (no copy) and is read-only;
+        callers that need to modify it must copy it first.
+        """
+        self._ui_needs_frame.set()
+        return self._published
+
+    def _status_due(self) -> bool:
+        return (
+            self._status_log_interval_ns > 0
+            and self._last_read_ns - self._last_log_ns >= self._status_log_interval_ns
+        )
+
+    def _frame_needed(self) -> bool:
+        # 录制、消费者已取走上一帧或需要输出状态日志时才需要解码
+        return (
+            self.recording.is_set()
+            or self._ui_needs_frame.is_set()
+            or self._status_due()
+        )
+
+    def _read_latest(self, frame_period_ns: int) -> tuple[bool, object, int]:
+        """Grab until a frame is needed, then retrieve only that one.
+
+        Stale frames are drained first if the backend queues frames and the
+        loop fell behind. Returns (ok, frame, grabbed); frame is None if the
+        stream stopped while idle.
+        """
+        assert self.cap is not None
+        cap = self.cap
+        behind_ns = _mono() - self._last_read_ns if self._last_read_ns > 0 else 0
+        if (
+            self._drain_stale
+            and frame_period_ns > 0
+            and 2 * behind_ns > 3 * frame_period_ns
+        ):
+            # 处理耗时超过 1.5 个帧周期：缓冲里可能已积压旧帧，grab() 丢弃后只解码最新一帧
+            stale = min(behind_ns // frame_period_ns, _MAX_DRAIN_FRAMES)
+            grabbed = 0
+            for _i in range(stale):
+                if not cap.grab():
+                    break
+                grabbed += 1
+            if not grabbed:
+                return False, None, 0
+            self._dropped_frames += grabbed - 1
+        else:
+            if not cap.grab():
+                return False, None, 0
+            grabbed = 1
+        self._last_read_ns = _mono()
+        # 是否解码在帧到达后再判断；空闲（不录制、无人取帧）时原地连续 grab()，
+        # 跳过 retrieve() 的整帧解码/颜色转换，也不回到外层循环做逐帧状态更新
+        frame_needed = self._frame_needed
+        is_running = self.running.is_set
+        coalesce = self._coalesce_idle
+        gap_ns = self._retrieve_gap_ns
+        while not frame_needed() or (
+            gap_ns and self._last_read_ns - self._last_retrieve_ns < gap_ns
+        ):
+            if not coalesce or not is_running():
+                return True, None, grabbed
+            if not cap.grab():
+                return False, None, grabbed
+            grabbed += 1
+            self._last_read_ns = _mono()
+        self._last_retrieve_ns = self._last_read_ns
+        ret, frame = cap.retrieve()
+        return ret, frame, grabbed
 
     def _loop(self) -> None:
         assert self.cap is not None
-        while self.running.is_set():
-            ret, frame = self.cap.read()
-            if not ret:
-                logger.warning(
-                    f"Camera {self.device_id}: failed to read frame; stopping"
-                )
-                break
-
-            # OpenCV 默认返回 uint8 BGR
-            frame_u8 = cast(NDArray[np.uint8], frame)
-            with self._frame_lock:
-                self._frame = frame_u8
-                self._frame_seq += 1
-                # update last frame size
-                self._last_frame_size = (int(frame_u8.shape[1]), int(frame_u8.shape[0]))
-                # 仅在录制期间计算 FPS（EMA），正常预览时不计算
-                if self.recording.is_set():
-                    now = time.time()
-                    if self._last_frame_time > 0:
-                        dt = max(1e-6, now - self._last_frame_time)
-                        inst_fps = 1.0 / dt
-                        a = self._ema_alpha
-                        self._fps_ema = a * inst_fps + (1.0 - a) * self._fps_ema
-                    self._last_frame_time = now
-
-            self._frame_count += 1
-            now = time.time()
-            if (
-                self._status_log_interval > 0
-                and (now - self._last_log_time) >= self._status_log_interval
-            ):
-                height = int(frame_u8.shape[0])
-                width = int(frame_u8.shape[1])
-                elapsed = now - self._start_time
-                fps = self._frame_count / elapsed if elapsed > 0 else 0
-                backend_name = (
-                    self.cap.getBackendName()
-                    if hasattr(self.cap, "getBackendName")
-                    else str(self.backend_flag)
-                )
-                logger.info(
-                    f"Camera {self.device_id}: {width}x{height}, ~{fps:.2f} FPS | backend={backend_name}"
-                )
-                self._last_log_time = now
-                self._frame_count = 0
-                self._start_time = now
-
-            if self.recording.is_set():
-                with self._writer_lock:
-                    if self.recording.is_set() and self.writer is not None:
-                        try:
-                            self.writer.write(frame_u8)
-                            self._rec_frame_count += 1
-                        except Exception as e:
-                            logger.warning(
-                                f"Camera {self.device_id}: writer.write failed ({e}); stopping recording"
-                            )
-                            # 发生异常时安全停止录制，避免线程崩溃
-                            self.recording.clear()
-                            try:
-                                if self.writer:
-                                    self.writer.release()
-                            finally:
-                                self.writer = None
+        if self.pin_cpu is not None:
+            self._pin_thread(self.pin_cpu)
+        frame_period_ns = self._frame_period_ns
+        # 绑定方法到局部变量，省去每帧的属性查找
+        is_running = self.running.is_set
+        step = self._step
+        try:
+            while is_running() and step(frame_period_ns):
+                pass
+        finally:
+            self.running.clear()
 
-        self.running.clear()
+    def _pin_thread(self, cpu: int) -> None:
+        # 固定在同一核上，grab/retrieve/发布之间帧数据留在该核缓存中，不随线程迁移被逐出
+        try:
+            os.sched_setaffinity(0, {cpu})  # Linux 上 0 表示当前线程
+        except Exception as e:
+            logger.warning(
+                f"Camera {self.device_id}: CPU pinning to {cpu} failed ({e})"
+            )
+            return
+        logger.info(f"Camera {self.device_id}: capture thread pinned to CPU {cpu}")
+
+    async def _aloop(self, pool: Executor) -> None:
+        """Reactor variant of _loop: each blocking step runs on the shared executor."""
+        loop = asyncio.get_running_loop()
+        frame_period_ns = self._frame_period_ns
+        try:
+            while self.running.is_set():
+                if not await loop.run_in_executor(pool, self._step, frame_period_ns):
+                    break
+        finally:
+            # _step 抛出异常时也要清除 running，否则 is_running() 会一直报告在运行
+            self.running.clear()
+
+    def _step(self, frame_period_ns: int) -> bool:
+        """Capture, publish and enqueue one frame; return False when the stream ends."""
+        if self._want_raw != self._raw_capture:
+            self._apply_raw_capture()
+        ret, frame, grabbed = self._read_latest(frame_period_ns)
+        self._frame_count += grabbed
+        if not ret:
+            return self._read_failed()
+        self._read_fail_ns = 0
+        if frame is None:
+            return True
+        status_due = self._status_due()
+
+        # OpenCV 默认返回 uint8 BGR
+        frame_u8 = cast(NDArray[np.uint8], frame)
+        # 复用读帧完成时刻，每帧不再额外读取时钟
+        now_ns = self._last_read_ns
+        record_frame = frame_u8
+        if frame_u8.ndim != 3:
+            # MJPG 直通录制：retrieve() 返回未解码的 JPEG 数据，原样送入录制队列，
+            # 仅在预览或状态日志需要时才解码
+            decoded = (
+                cv2.imdecode(frame_u8, cv2.IMREAD_COLOR)
+                if self._ui_needs_frame.is_set() or status_due
+                else None
+            )
+            if decoded is None:
+                self._record(record_frame, now_ns)
+                return True
+            frame_u8 = cast(NDArray[np.uint8], decoded)
+        # 每次 read() 都返回新数组，发布后冻结为只读即可安全共享
+        frame_u8.flags.writeable = False
+        self._ui_needs_frame.clear()
+        self._published = (self._published[0] + 1, frame_u8)
+        on_frame = self.on_frame
+        if on_frame is not None:
+            on_frame(self.device_id)
+        hw = frame_u8.shape[:2]
+        if hw != self._frame_hw:
+            self._frame_hw = (hw[0], hw[1])
+            self._last_frame_size = (hw[1], hw[0])
+
+        if status_due:
+            height, width = self._frame_hw
+            elapsed_ns = now_ns - self._start_ns
+            fps = self._frame_count * _NS_PER_SEC / elapsed_ns if elapsed_ns > 0 else 0
+            # 使用 loguru 位置参数：被级别过滤时不做字符串格式化
+            logger.info(
+                "Camera {}: {}x{}, ~{:.2f} FPS | backend={} dropped={}",
+                self.device_id,
+                width,
+                height,
+                fps,
+                self._backend_name,
+                self._dropped_frames,
+            )
+            self._last_log_ns = now_ns
+            self._frame_count = 0
+            self._start_ns = now_ns
+
+        self._record(record_frame, now_ns)
+        return True
+
+    def _apply_raw_capture(self) -> None:
+        # 只在采集线程、两次读帧之间调用
+        assert self.cap is not None
+        want = self._want_raw
+        _ = self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0 if want else 1)
+        self._raw_capture = want
+
+    def _read_failed(self) -> bool:
+        # 偶发的读帧失败（USB 抖动、驱动重新协商）短暂退避后重试，而不是立即停止
+        now_ns = _mono()
+        if self._read_fail_ns == 0:
+            self._read_fail_ns = now_ns
+            self._read_backoff_s = _READ_BACKOFF_MIN_S
+        elif now_ns - self._read_fail_ns > _READ_FAIL_TIMEOUT_NS:
+            logger.warning(f"Camera {self.device_id}: failed to read frame; stopping")
+            return False
+        time.sleep(self._read_backoff_s)
+        # 退避期间没有读帧，恢复后不应把这段时间算作落后而去丢帧
+        self._last_read_ns = 0
+        self._read_backoff_s = min(self._read_backoff_s * 2, _READ_BACKOFF_MAX_S)
+        return True
+
+    def _record(self, frame: NDArray[np.uint8], now_ns: int) -> None:
+        # 录制标志与队列每帧只读取一次；未录制时直接返回，不计算 FPS（EMA）。只在采集线程调用
+        if not self.recording.is_set():
+            return
+        last_ns = self._last_frame_ns
+        if last_ns > 0:
+            inst_q16 = (_NS_PER_SEC << 16) // max(1, now_ns - last_ns)
+            a = self._ema_alpha_q16
+            self._fps_ema_q16 = (
+                a * inst_q16 + (_Q16_ONE - a) * self._fps_ema_q16
+            ) >> 16
+        self._last_frame_ns = now_ns
+        write_q = self._write_q
+        if write_q is not None:
+            # 帧只读且不复用，直接入队引用；编码跟不上时丢帧，不阻塞采集
+            try:
+                write_q.put_nowait(frame)
+            except queue.Full:
+                self._dropped_enc += 1
+
+    def _encoder_loop(
+        self, writer: FrameWriter, write_q: queue.Queue[NDArray[np.uint8] | None]
+    ) -> None:
+        """Drain write_q into writer until the None sentinel arrives, then release it.
+
+        The writer is owned by this thread: nothing else writes to or releases
+        it, so the per-frame path takes no lock.
+        """
+        # 每次录制都新建本线程，writer 与队列在线程存续期间不变，入口处取一次方法即可
+        get = write_q.get
+        write = writer.write
+        try:
+            while True:
+                frm = get()
+                if frm is None:
+                    break
+                try:
+                    _ = write(frm)
+                    self._rec_frame_count += 1
+                except Exception as e:
+                    logger.warning(
+                        f"Camera {self.device_id}: writer.write failed ({e}); stopping recording"
+                    )
+                    # 发生异常时停止录制，由 finally 释放 writer，避免线程崩溃
+                    self.recording.clear()
+                    break
+        finally:
+            writer.release()
 
     def get_status(self) -> dict[str, object]:
         """Return a snapshot of current status for UI display.
-        Keys: 'fps' (float), 'size' (tuple[int,int] | None), 'recording' (bool)
+        Keys: 'fps' (float), 'size' (tuple[int,int] | None), 'recording' (bool),
+        'dropped' (int, frames skipped to catch up with the camera)
         """
-        with self._frame_lock:
-            rec = self.recording.is_set()
-            fps = float(self._fps_ema) if rec else 0.0
-            size = self._last_frame_size
-        return {"fps": fps, "size": size, "recording": rec}
+        # 各字段均为单次原子赋值，无需加锁
+        rec = self.recording.is_set()
+        fps = self._fps_ema_q16 / _Q16_ONE if rec else 0.0
+        size = self._last_frame_size
+        return {
+            "fps": fps,
+            "size": size,
+            "recording": rec,
+            "dropped": self._dropped_frames,
+        }
 
     def close(self) -> None:
         self.stop_recording()
+        # 先停止采集循环并等待其退出，再释放 cap，避免循环读到已释放/置空的 cap
+        self.running.clear()
+        if self._thread is not None and self._thread is not current_thread():
+            self._thread.join(timeout=_CLOSE_JOIN_TIMEOUT_S)
+        if self._capture_future is not None:
+            try:
+                self._capture_future.result(timeout=_CLOSE_JOIN_TIMEOUT_S)
+            except Exception:
+                pass
         if self.cap:
             try:
                 self.cap.release()
             finally:
                 self.cap = None
         logger.info(f"Camera {self.device_id}: closed")
+
+
+class CaptureReactor:
+    """Run the capture loops of many cameras on one asyncio event-loop thread.
+
+    Blocking grab/retrieve steps are dispatched to a shared executor whose size
+    (workers) bounds how many cameras capture concurrently, instead of one OS
+    thread per camera.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        if workers <= 0:
+            workers = max(1, cv2.getNumberOfCPUs() // 2)
+        self.workers: int = workers
+        self._pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="CaptureIO"
+        )
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._thread: Thread = Thread(
+            target=self._loop.run_forever, name="CaptureReactor", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Capture reactor started with {workers} I/O worker(s)")
+
+    def add(self, cam: CameraStream) -> Future[None]:
+        """Schedule cam's capture loop; safe to call from any thread."""
+        return asyncio.run_coroutine_threadsafe(cam._aloop(self._pool), self._loop)  # pyright: ignore[reportPrivateUsage]
+
+    def close(self) -> None:
+        _ = self._loop.call_soon_threadsafe(self._loop.stop)
+        self._pool.shutdown(wait=False, cancel_futures=True)
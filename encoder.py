@@ -0,0 +1,512 @@
+"""
+Recording writers for OpenCamV: NVENC via ffmpegcv when available, other ffmpeg hardware
+H.264 encoders (VAAPI/VideoToolbox) through a raw-video pipe, cv2.VideoWriter otherwise,
+plus an MJPG passthrough muxer (PyAV) for cameras that already deliver JPEG.
+"""
+
+from __future__ import annotations
+
+import math
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from fractions import Fraction
+from functools import cache
+from pathlib import Path
+from typing import IO, Protocol, cast
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from loguru import logger
+
+# 按优先级尝试的 ffmpeg 硬件 H.264 编码器（NVENC 优先走 ffmpegcv，此处作为其不可用时的后备）
+_HW_H264_ENCODERS = ("h264_nvenc", "h264_vaapi", "h264_videotoolbox")
+_VAAPI_DEVICE = "/dev/dri/renderD128"
+# 硬件编码器启动期（自首次写入起，秒）：此期间写入失败视为编码器初始化失败，改用 cv2.VideoWriter 重新打开。
+# 管道缓冲会先吸收若干帧，错误要晚一些才在写入时暴露，因此按时间而非帧数计
+_HW_STARTUP_S = 2.0
+# JPEG SOF 段中亮度分量的采样因子 (H, V) 到 FFmpeg 像素格式的映射
+_JPEG_PIX_FMTS = {(1, 1): "yuvj444p", (2, 1): "yuvj422p", (2, 2): "yuvj420p"}
+
+
+class FrameWriter(Protocol):
+    """Subset of the cv2.VideoWriter API used by CameraStream."""
+
+    def isOpened(self) -> bool: ...
+
+    # 仅位置参数、返回值不使用：ffmpegcv 与 cv2.VideoWriter 的参数名与返回类型各不相同
+    def write(self, image: NDArray[np.uint8], /) -> object: ...
+
+    def release(self) -> None: ...
+
+
+class _I420Writer:
+    """Convert BGR frames to planar I420 with OpenCV before piping them to ffmpeg.
+
+    Halves the bytes sent to the encoder process (1.5 vs 3 bytes/pixel) and
+    replaces ffmpeg's swscale BGR->YUV pass with OpenCV's SIMD conversion.
+    """
+
+    def __init__(self, inner: FrameWriter) -> None:
+        self._inner: FrameWriter = inner
+        self._yuv: NDArray[np.uint8] | None = None
+
+    def isOpened(self) -> bool:
+        return bool(self._inner.isOpened())
+
+    def write(self, image: NDArray[np.uint8]) -> None:
+        h, w = image.shape[:2]
+        if self._yuv is None or self._yuv.shape != (h * 3 // 2, w):
+            self._yuv = np.empty((h * 3 // 2, w), dtype=np.uint8)
+        # ffmpegcv / 管道写入返回前已拷贝或写完数据，因此缓冲可跨帧复用
+        _ = cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420, dst=self._yuv)
+        _ = self._inner.write(self._yuv)
+
+    def release(self) -> None:
+        self._inner.release()
+
+
+class _Cv2FallbackWriter:
+    """Reopen the output with cv2.VideoWriter if a hardware writer fails while starting.
+
+    ffmpeg only initialises the encoder once frames arrive, so a listed but
+    unusable device shows up as a failed write rather than a failed open.
+    Failures later than _HW_STARTUP_S after the first write are raised as
+    usual, so a recording that already has content is never overwritten.
+    """
+
+    def __init__(
+        self,
+        inner: FrameWriter,
+        label: str,
+        output_path: Path,
+        fourcc_str: str,
+        fps: float,
+        size: tuple[int, int],
+    ) -> None:
+        self._inner: FrameWriter = inner
+        self._label: str = label
+        self._output_path: Path = output_path
+        self._fourcc_str: str = fourcc_str
+        self._fps: float = fps
+        self._size: tuple[int, int] = size
+        # 实际使用的编码器：回退后变为 cv2 的 fourcc
+        self.codec: str = label
+        # 首次写入的时刻；None 表示尚未写入，-inf 表示启动期已结束（已回退到 cv2）
+        self._started: float | None = None
+
+    def isOpened(self) -> bool:
+        return bool(self._inner.isOpened())
+
+    def write(self, image: NDArray[np.uint8]) -> None:
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        elif now - self._started > _HW_STARTUP_S:
+            _ = self._inner.write(image)
+            return
+        try:
+            _ = self._inner.write(image)
+        except Exception as e:
+            logger.warning(
+                f"{self._label} writer failed for {self._output_path.name} ({e}); falling back to cv2.VideoWriter"
+            )
+            try:
+                self._inner.release()
+            except Exception:
+                pass
+            opened = _open_cv2_writer(
+                self._output_path, self._fourcc_str, self._fps, self._size
+            )
+            if opened is None:
+                raise
+            self._inner = opened
+            self.codec = self._fourcc_str
+            # 已切换到 cv2 写入器，不再需要启动期保护
+            self._started = -math.inf
+            _ = self._inner.write(image)
+
+    def release(self) -> None:
+        self._inner.release()
+
+
+class MjpegPassthroughWriter:
+    """Mux camera MJPG packets into an AVI container without decoding or re-encoding.
+
+    write() takes either an undecoded JPEG buffer (1-D or 1xN uint8, as returned
+    by retrieve() with CAP_PROP_CONVERT_RGB=0) or a BGR frame, which is JPEG
+    encoded first so a backend that ignores CONVERT_RGB still records correctly.
+    """
+
+    def __init__(self, output_path: Path, fps: float, size: tuple[int, int]) -> None:
+        import av
+        from av.container import OutputContainer
+        from av.stream import Stream
+
+        rate = Fraction(fps).limit_denominator(1001) if fps > 0 else Fraction(30)
+        self._time_base: Fraction = 1 / rate
+        self._container: OutputContainer = av.open(str(output_path), "w")
+        self._stream: av.VideoStream = self._container.add_stream("mjpeg", rate=rate)
+        self._stream.width, self._stream.height = size
+        self._stream.time_base = self._time_base
+        self._packet: type[av.Packet[Stream]] = av.Packet
+        self._pts: int = 0
+        self._open: bool = True
+
+    def isOpened(self) -> bool:
+        return self._open
+
+    def write(self, image: NDArray[np.uint8]) -> None:
+        if image.ndim == 3:
+            ok, buf = cv2.imencode(".jpg", image)
+            if not ok:
+                raise RuntimeError("JPEG encode failed")
+            image = cast(NDArray[np.uint8], buf)
+        # JPEG 数据只有几十 KB，tobytes() 拷贝开销可忽略
+        data = image.tobytes()
+        if self._pts == 0:
+            # 容器头在首次 mux 时写入，此前按首帧实际的色度采样设置像素格式
+            pix_fmt = _jpeg_pix_fmt(data)
+            if pix_fmt is not None:
+                self._stream.pix_fmt = pix_fmt
+        packet = self._packet(data)
+        packet.stream = self._stream
+        packet.pts = packet.dts = self._pts
+        packet.time_base = self._time_base
+        packet.is_keyframe = True
+        self._container.mux(packet)
+        self._pts += 1
+
+    def release(self) -> None:
+        if self._open:
+            self._open = False
+            self._container.close()
+
+
+def _jpeg_pix_fmt(data: bytes) -> str | None:
+    """Return the pixel format declared by a JPEG's SOF header, or None if unknown."""
+    i = 2  # 跳过 SOI
+    while i + 4 <= len(data) and data[i] == 0xFF:
+        marker = data[i + 1]
+        length = int.from_bytes(data[i + 2 : i + 4], "big")
+        # SOF0/1/2：基线、扩展顺序与渐进式
+        if marker in (0xC0, 0xC1, 0xC2):
+            if i + 13 > len(data):
+                return None
+            if data[i + 9] == 1:
+                return "gray"
+            sampling = data[i + 11]
+            return _JPEG_PIX_FMTS.get((sampling >> 4, sampling & 0x0F))
+        # SOS 之后是熵编码数据，不会再出现 SOF
+        if marker == 0xDA:
+            return None
+        i += 2 + length
+    return None
+
+
+class FfmpegPipeWriter:
+    """Pipe raw frames to an ffmpeg subprocess encoding with a hardware H.264 encoder.
+
+    pix_fmt describes what write() receives: "bgr24" (H, W, 3) or "yuv420p"
+    planar I420 (1.5H, W), e.g. via _I420Writer.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        fps: float,
+        size: tuple[int, int],
+        encoder: str,
+        preset: str = "p4",
+        pix_fmt: str = "bgr24",
+    ) -> None:
+        w, h = size
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+        if encoder == "h264_vaapi":
+            cmd += ["-vaapi_device", _VAAPI_DEVICE]
+        cmd += [
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            pix_fmt,
+            "-s",
+            f"{w}x{h}",
+            "-r",
+            f"{fps if fps > 0 else 30.0:g}",
+            "-i",
+            "pipe:0",
+        ]
+        if encoder == "h264_vaapi":
+            # VAAPI 只接受 GPU 表面：先转 nv12 再上传
+            cmd += ["-vf", "format=nv12,hwupload"]
+        cmd += ["-c:v", encoder]
+        if encoder == "h264_nvenc":
+            cmd += ["-preset", preset]
+        cmd.append(str(output_path))
+        self._encoder: str = encoder
+        self._proc: subprocess.Popen[bytes] = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        # 后台读取 ffmpeg 的 stderr，保留最后几行用于报错；不读取会在输出较多时阻塞 ffmpeg
+        self._stderr_tail: deque[str] = deque(maxlen=8)
+        # 写入失败时已带原因抛出，release() 不再重复告警
+        self._failed: bool = False
+        self._stderr_thread: threading.Thread = threading.Thread(
+            target=self._drain_stderr, name=f"ffmpeg-{encoder}-stderr", daemon=True
+        )
+        self._stderr_thread.start()
+
+    def _drain_stderr(self) -> None:
+        assert self._proc.stderr is not None
+        stderr: IO[bytes] = self._proc.stderr
+        for line in stderr:
+            text = line.decode(errors="replace").strip()
+            if text:
+                self._stderr_tail.append(text)
+
+    def error_text(self) -> str:
+        """Return ffmpeg's exit code and last stderr lines, for log messages."""
+        self._stderr_thread.join(timeout=1.0)
+        tail = " | ".join(self._stderr_tail) or "no output"
+        return f"ffmpeg {self._encoder} exited with {self._proc.poll()}: {tail}"
+
+    def isOpened(self) -> bool:
+        return self._proc.poll() is None
+
+    def write(self, image: NDArray[np.uint8]) -> None:
+        assert self._proc.stdin is not None
+        # 直接写入数组缓冲区（memoryview），避免 tobytes() 每帧分配并拷贝整帧
+        if not image.flags.c_contiguous:
+            image = np.ascontiguousarray(image)
+        try:
+            _ = self._proc.stdin.write(memoryview(image))
+        except OSError as e:
+            # 管道断开说明 ffmpeg 已退出：等待其结束并带上 stderr 中的原因
+            try:
+                _ = self._proc.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                pass
+            self._failed = True
+            raise RuntimeError(self.error_text()) from e
+
+    def release(self) -> None:
+        if self._proc.stdin is not None and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            _ = self._proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            return
+        if self._proc.returncode != 0 and not self._failed:
+            logger.warning(self.error_text())
+
+
+@cache
+def _ffmpeg_encoders() -> str:
+    """Return the output of `ffmpeg -encoders`, or "" if ffmpeg is missing (probed once)."""
+    if shutil.which("ffmpeg") is None:
+        return ""
+    try:
+        return subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.info(f"ffmpeg -encoders failed ({e}); hardware encoders disabled")
+        return ""
+
+
+def _encoder_works(name: str) -> bool:
+    """Encode one synthetic frame with name; listed encoders may still fail to initialise."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if name == "h264_vaapi":
+        cmd += ["-vaapi_device", _VAAPI_DEVICE]
+    cmd += ["-f", "lavfi", "-i", "nullsrc=s=320x240", "-frames:v", "1"]
+    if name == "h264_vaapi":
+        cmd += ["-vf", "format=nv12,hwupload"]
+    cmd += ["-c:v", name, "-f", "null", "-"]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.info(f"ffmpeg {name} test encode failed ({e}); skipping")
+        return False
+    if proc.returncode != 0:
+        err = proc.stderr.strip().splitlines()
+        logger.info(
+            f"ffmpeg {name} test encode failed ({err[-1] if err else proc.returncode}); skipping"
+        )
+        return False
+    return True
+
+
+@cache
+def hw_h264_encoder() -> str | None:
+    """Return the first usable ffmpeg hardware H.264 encoder name, or None (probed once).
+
+    Candidates must be listed by ffmpeg and pass a one-frame test encode.
+    """
+    out = _ffmpeg_encoders()
+    for name in _HW_H264_ENCODERS:
+        if name not in out:
+            continue
+        if name == "h264_nvenc" and shutil.which("nvidia-smi") is None:
+            continue
+        if name == "h264_vaapi" and not Path(_VAAPI_DEVICE).exists():
+            continue
+        if name == "h264_videotoolbox" and sys.platform != "darwin":
+            continue
+        if not _encoder_works(name):
+            continue
+        return name
+    return None
+
+
+@cache
+def passthrough_available() -> bool:
+    """Return True if PyAV is importable (probed once)."""
+    try:
+        import av  # noqa: F401  # pyright: ignore[reportUnusedImport]
+    except Exception:
+        return False
+    return True
+
+
+@cache
+def nvenc_available() -> bool:
+    """Return True if ffmpeg exposes h264_nvenc and ffmpegcv is importable (probed once)."""
+    if hw_h264_encoder() != "h264_nvenc":
+        return False
+    try:
+        import ffmpegcv  # noqa: F401  # pyright: ignore[reportUnusedImport]
+    except Exception:
+        # ffmpegcv 在找不到 ffmpeg 时 import 即抛 RuntimeError，统一视为不可用
+        return False
+    return True
+
+
+def open_writer(
+    output_path: Path,
+    fourcc_str: str,
+    fps: float,
+    size: tuple[int, int],
+    use_hw_encoder: bool = False,
+    nvenc_preset: str = "p4",
+) -> tuple[FrameWriter, str] | None:
+    """Open a writer for output_path and return (writer, codec_label), or None on failure.
+
+    mp4 outputs with use_hw_encoder use h264_nvenc via ffmpegcv when available, else
+    the first ffmpeg hardware encoder found (NVENC/VAAPI/VideoToolbox) through a pipe;
+    everything else (and any failure) falls back to cv2.VideoWriter with fourcc_str,
+    including a hardware writer whose first frames fail to write.
+    Even-sized hardware-encoded streams are fed yuv420p instead of bgr24.
+    """
+    if use_hw_encoder and output_path.suffix == ".mp4" and nvenc_available():
+        try:
+            import ffmpegcv
+
+            w, h = size
+            # I420 要求宽高为偶数；奇数尺寸仍走 bgr24 由 ffmpeg 自行转换
+            yuv_input = w % 2 == 0 and h % 2 == 0
+            nv_writer = ffmpegcv.VideoWriterNV(
+                str(output_path),
+                codec="h264",
+                fps=fps,
+                pix_fmt="yuv420p" if yuv_input else "bgr24",
+                preset=nvenc_preset,
+            )
+            writer = cast(FrameWriter, nv_writer)
+            if yuv_input:
+                writer = _I420Writer(writer)
+            return _Cv2FallbackWriter(
+                writer, "h264_nvenc", output_path, fourcc_str, fps, size
+            ), "h264_nvenc"
+        except Exception as e:
+            logger.warning(
+                f"NVENC writer failed for {output_path.name} ({e}); falling back to cv2.VideoWriter"
+            )
+    elif use_hw_encoder and output_path.suffix == ".mp4":
+        encoder = hw_h264_encoder()
+        if encoder is not None:
+            try:
+                w, h = size
+                yuv_input = w % 2 == 0 and h % 2 == 0
+                pipe_writer = FfmpegPipeWriter(
+                    output_path,
+                    fps,
+                    size,
+                    encoder,
+                    nvenc_preset,
+                    pix_fmt="yuv420p" if yuv_input else "bgr24",
+                )
+                if pipe_writer.isOpened():
+                    writer = _I420Writer(pipe_writer) if yuv_input else pipe_writer
+                    return _Cv2FallbackWriter(
+                        writer, encoder, output_path, fourcc_str, fps, size
+                    ), encoder
+                logger.warning(
+                    f"{pipe_writer.error_text()}; falling back to cv2.VideoWriter"
+                )
+                pipe_writer.release()
+            except Exception as e:
+                logger.warning(
+                    f"{encoder} writer failed for {output_path.name} ({e}); falling back to cv2.VideoWriter"
+                )
+
+    cv_writer = _open_cv2_writer(output_path, fourcc_str, fps, size)
+    if cv_writer is None:
+        return None
+    return cv_writer, fourcc_str
+
+
+def _open_cv2_writer(
+    output_path: Path, fourcc_str: str, fps: float, size: tuple[int, int]
+) -> FrameWriter | None:
+    fourcc = cv2.VideoWriter.fourcc(*fourcc_str)
+    cv_writer = cv2.VideoWriter(str(output_path), fourcc, fps, size)
+    if cv_writer and cv_writer.isOpened():
+        return cast(FrameWriter, cv_writer)
+    if cv_writer:
+        cv_writer.release()
+    return None
+
+
+def writer_codec(writer: FrameWriter, label: str) -> str:
+    """Return the codec writer is actually using: label, unless it fell back to cv2."""
+    if isinstance(writer, _Cv2FallbackWriter):
+        return writer.codec
+    return label
+
+
+def open_passthrough_writer(
+    output_path: Path, fps: float, size: tuple[int, int]
+) -> tuple[FrameWriter, str] | None:
+    """Open an MJPG passthrough AVI writer, or return None if PyAV is unavailable/fails."""
+    if not passthrough_available():
+        return None
+    try:
+        return MjpegPassthroughWriter(output_path, fps, size), "MJPG-copy"
+    except Exception as e:
+        logger.warning(f"MJPG passthrough writer failed for {output_path.name} ({e})")
+        return None
+
+
+__all__ = [
+    "FfmpegPipeWriter",
+    "FrameWriter",
+    "MjpegPassthroughWriter",
+    "hw_h264_encoder",
+    "nvenc_available",
+    "open_passthrough_writer",
+    "open_writer",
+    "passthrough_available",
+    "writer_codec",
+]
@@ -9,7 +9,7 @@ def setup_logging(log_dir: str | Path | None = None, level: str = "INFO") -> Non
     """
     Configure loguru logger with console and optional file sink.
 
-    - Console: colored, level from env/param.
+    - Console: colored, level from env/param; enqueued so capture threads never block on stderr.
     - File (optional): rotated daily and 50 MB, 10 backups.
     """
     logger.remove()
@@ -17,6 +17,7 @@ def setup_logging(log_dir: str | Path | None = None, level: str = "INFO") -> Non
         sys.stderr,
         level=level,
         colorize=True,
+        enqueue=True,
         format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
     )  # pyright: ignore[reportUnusedCallResult]
 
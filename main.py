@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import os
 from pathlib import Path
 
-from logger import setup_logging, logger
-from app import AppConfig
-from ui_qt import run_qt
+# 须在 cv2（经由 app/camera 导入）加载前设置：N 路相机线程各自触发 OpenMP 线程池会造成线程风暴
+_ = os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+from logger import setup_logging, logger  # noqa: E402
+from app import AppConfig  # noqa: E402
+from ui_qt import run_qt  # noqa: E402
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -60,6 +64,66 @@ def build_parser() -> argparse.ArgumentParser:
         default=0.0,
         help="Interval (seconds) for periodic camera status logs; 0 disables",
     )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--cv-threads",
+        type=int,
+        default=1,
+        help="OpenCV worker threads (cv2.setNumThreads); cameras already run in parallel",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--hw-encoder",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Use hardware H.264 (NVENC/VAAPI/VideoToolbox) for mp4 when available; falls back to OpenCV",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--nvenc-preset",
+        type=str,
+        default="p4",
+        help="NVENC preset (p1 fastest .. p7 best quality)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--mjpeg-passthrough",
+        action="store_true",
+        help="For avi output on V4L2 MJPG cameras, mux camera JPEGs directly (needs PyAV)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--record-queue",
+        type=int,
+        default=4,
+        help="Frames buffered per camera between capture and encoder; extra frames are dropped",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--hw-decode",
+        action="store_true",
+        help="Request hardware-accelerated decoding when opening cameras (OpenCV 4.5.2+)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--tiled-record",
+        action="store_true",
+        help="Record all cameras as one tiled mosaic file (single encoder session)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--smooth-preview",
+        action="store_true",
+        help="Scale preview tiles with bilinear filtering (slower; default nearest-neighbor)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--async-capture",
+        action="store_true",
+        help="Drive all cameras from one asyncio loop with a shared read thread pool",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--capture-workers",
+        type=int,
+        default=0,
+        help="Read thread pool size for --async-capture (0 = half the camera count, rounded up; fewer workers than cameras lowers per-camera fps)",
+    )  # pyright: ignore[reportUnusedCallResult]
+    p.add_argument(
+        "--pin-cpus",
+        action="store_true",
+        help="Pin each camera capture thread to its own CPU core (Linux only)",
+    )  # pyright: ignore[reportUnusedCallResult]
     return p
 
 
@@ -78,6 +142,17 @@ def main(argv: list[str] | None = None) -> int:
         device_mask=args.device_mask,  # pyright: ignore[reportAny]
         max_devices=args.max_devices,  # pyright: ignore[reportAny]
         status_log_interval_sec=args.status_log_interval_sec,  # pyright: ignore[reportAny]
+        cv_threads=args.cv_threads,  # pyright: ignore[reportAny]
+        use_hw_encoder=args.hw_encoder,  # pyright: ignore[reportAny]
+        nvenc_preset=args.nvenc_preset,  # pyright: ignore[reportAny]
+        mjpeg_passthrough=args.mjpeg_passthrough,  # pyright: ignore[reportAny]
+        record_queue_size=args.record_queue,  # pyright: ignore[reportAny]
+        hw_decode=args.hw_decode,  # pyright: ignore[reportAny]
+        tiled_record=args.tiled_record,  # pyright: ignore[reportAny]
+        smooth_preview=args.smooth_preview,  # pyright: ignore[reportAny]
+        async_capture=args.async_capture,  # pyright: ignore[reportAny]
+        capture_workers=args.capture_workers,  # pyright: ignore[reportAny]
+        pin_cpus=args.pin_cpus,  # pyright: ignore[reportAny]
     )
 
     # 统一使用 Qt UI 运行，避免 OpenCV 窗口阻塞与按键轮询
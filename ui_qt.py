@@ -16,24 +16,43 @@ from camera import CameraStream
 from logger import logger
 
 
-def np_bgr_to_qimage(img: NDArray[np.uint8] | None) -> QtGui.QImage:
-    """Convert BGR uint8 image (H, W, 3) to QImage (RGB)."""
-    if img is None or img.size == 0:
-        return QtGui.QImage()
-    h, w, ch = img.shape
-    assert ch == 3
-    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    bytes_per_line = ch * w
-    return QtGui.QImage(
-        rgb.data, w, h, bytes_per_line, QtGui.QImage.Format.Format_RGB888
-    )
+class FrameBridge(QtCore.QObject):
+    """Forward frame-arrival callbacks from capture threads to the GUI thread.
+
+    notify() is called on capture threads; the frame_ready signal is delivered
+    through a queued connection. At most one notification per camera is in
+    flight, so a busy GUI never builds up a backlog.
+    """
+
+    frame_ready: QtCore.Signal = QtCore.Signal(int)
+
+    def __init__(self, parent: QtCore.QObject | None = None) -> None:
+        super().__init__(parent)
+        self._pending: set[int] = set()
+
+    def notify(self, device_id: int) -> None:
+        # set 的成员判断与 add 在 GIL 下各自原子；偶发重复通知无害
+        if device_id not in self._pending:
+            self._pending.add(device_id)
+            self.frame_ready.emit(device_id)
+
+    def done(self, device_id: int) -> None:
+        self._pending.discard(device_id)
 
 
 class VideoWidget(QtWidgets.QLabel):
     """A QLabel-based widget to show frames efficiently."""
 
-    def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
+    def __init__(
+        self, parent: QtWidgets.QWidget | None = None, smooth: bool = False
+    ) -> None:
         super().__init__(parent)
+        # 放大显示时默认最近邻缩放（FastTransformation），开销远低于双线性
+        self._transform: QtCore.Qt.TransformationMode = (
+            QtCore.Qt.TransformationMode.SmoothTransformation
+            if smooth
+            else QtCore.Qt.TransformationMode.FastTransformation
+        )
         self.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         self.setSizePolicy(
             QtWidgets.QSizePolicy.Policy.Expanding,
@@ -41,24 +60,95 @@ class VideoWidget(QtWidgets.QLabel):
         )
         self.setMinimumSize(320, 180)
         self.setStyleSheet("background-color: #000;")
+        # 已显示内容的 (seq, 宽, 高)：帧与控件尺寸都未变化时跳过转换与缩放
+        self._cached_key: tuple[int, int, int] | None = None
+        # 缩小显示时 cv2.resize 的目标缓冲，按显示尺寸复用
+        self._scaled_buf: NDArray[np.uint8] | None = None
+        # 上传给 Qt 的 32 位 BGRA 缓冲（Format_RGB32 的小端内存布局），同样按尺寸复用
+        self._bgra_buf: NDArray[np.uint8] | None = None
+        # 当前显示的 pixmap（已按控件尺寸缩放），由 paintEvent 直接 1:1 绘制
+        self._pix: QtGui.QPixmap | None = None
 
-    def show_frame(self, frame: NDArray[np.uint8] | None) -> None:
+    def show_frame(self, frame: NDArray[np.uint8] | None, seq: int = -1) -> None:
+        """Show a BGR frame; the pixmap is built immediately so the buffer may be reused.
+
+        With seq >= 0 the call is a no-op when the same frame was already shown at
+        the current widget size. Frames larger than the widget are downscaled with
+        cv2.resize(INTER_AREA) before upload, so Qt never touches the full frame.
+        """
         if frame is None:
-            self.clear()
+            self._cached_key = None
+            self._pix = None
+            self.update()
             return
-        img = np_bgr_to_qimage(frame)
-        pix = QtGui.QPixmap.fromImage(img)
-        # Scale to fit, keep aspect ratio, smooth
-        pix = pix.scaled(
-            self.size(),
-            QtCore.Qt.AspectRatioMode.KeepAspectRatio,
-            QtCore.Qt.TransformationMode.SmoothTransformation,
-        )
-        self.setPixmap(pix)
+        size = self.size()
+        key = (seq, size.width(), size.height())
+        if seq >= 0 and key == self._cached_key:
+            return
+        fh, fw = frame.shape[:2]
+        scale = min(size.width() / fw, size.height() / fh)
+        if scale < 1.0:
+            # Fit inside the widget, keep aspect ratio
+            dsize = (max(1, int(fw * scale)), max(1, int(fh * scale)))
+            buf = self._scaled_buf
+            if buf is None or buf.shape[:2] != (dsize[1], dsize[0]):
+                buf = np.empty((dsize[1], dsize[0], 3), dtype=np.uint8)
+                self._scaled_buf = buf
+            _ = cv2.resize(frame, dsize, dst=buf, interpolation=cv2.INTER_AREA)
+            # raster 后端的 fromImage 可能直接共享 QImage 数据，而 _bgra_buf 下一帧会被覆盖；
+            # 先 copy() 出独立的 QImage，pixmap 不再引用复用的缓冲
+            pix = QtGui.QPixmap.fromImage(self._to_rgb32(buf).copy())
+        else:
+            # 小于控件时由 Qt 放大：直接画到目标尺寸的 pixmap 上，不生成原尺寸的中间 pixmap
+            target = QtCore.QSize(fw, fh).scaled(
+                size, QtCore.Qt.AspectRatioMode.KeepAspectRatio
+            )
+            pix = QtGui.QPixmap(target)
+            painter = QtGui.QPainter(pix)
+            painter.setRenderHint(
+                QtGui.QPainter.RenderHint.SmoothPixmapTransform,
+                self._transform == QtCore.Qt.TransformationMode.SmoothTransformation,
+            )
+            painter.drawImage(pix.rect(), self._to_rgb32(frame))
+            _ = painter.end()
+        # 不经 setPixmap：避免每帧触发 QLabel 的尺寸提示/布局更新，只请求重绘
+        self._pix = pix
+        self.update()
+        self._cached_key = key if seq >= 0 else None
+
+    def _to_rgb32(self, img: NDArray[np.uint8]) -> QtGui.QImage:
+        """Convert BGR to BGRA in a reused buffer and wrap it as Format_RGB32.
+
+        32-bit pixels are Qt's native raster format, so fromImage/drawImage copy
+        them without the per-pixel repack that 24-bit RGB888/BGR888 needs.
+        """
+        h, w = img.shape[:2]
+        buf = self._bgra_buf
+        if buf is None or buf.shape[:2] != (h, w):
+            buf = np.empty((h, w, 4), dtype=np.uint8)
+            self._bgra_buf = buf
+        _ = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA, dst=buf)
+        return QtGui.QImage(buf.data, w, h, 4 * w, QtGui.QImage.Format.Format_RGB32)
+
+    @override
+    def paintEvent(self, e: QtGui.QPaintEvent) -> None:
+        # pixmap 已预缩放到显示尺寸，居中原样绘制；显式关闭平滑/抗锯齿，
+        # 不走 QLabel + 样式表的绘制路径
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform, False)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing, False)
+        painter.fillRect(self.rect(), QtCore.Qt.GlobalColor.black)
+        pix = self._pix
+        if pix is not None:
+            x = (self.width() - pix.width()) // 2
+            y = (self.height() - pix.height()) // 2
+            painter.drawPixmap(x, y, pix)
+        _ = painter.end()
 
     @override
     def resizeEvent(self, e: QtGui.QResizeEvent) -> None:
-        # 保持简单；由定时器驱动的刷新会更新视图
+        # 缓存键含控件尺寸：下一帧到达（FrameBridge.frame_ready）时按新尺寸重新缩放，
+        # 相机无新帧时由 200 ms 兜底定时器刷新
         super().resizeEvent(e)
 
 
@@ -66,7 +156,10 @@ class CameraTile(QtWidgets.QWidget):
     """A camera tile with a title and a video view."""
 
     def __init__(
-        self, cam: CameraStream, parent: QtWidgets.QWidget | None = None
+        self,
+        cam: CameraStream,
+        parent: QtWidgets.QWidget | None = None,
+        smooth: bool = False,
     ) -> None:
         super().__init__(parent)
         self.cam: CameraStream = cam
@@ -77,7 +170,7 @@ class CameraTile(QtWidgets.QWidget):
         self.status.setStyleSheet(
             "color: #aaa; padding: 0 4px 4px 4px; font-size: 12px;"
         )
-        self.video: VideoWidget = VideoWidget()
+        self.video: VideoWidget = VideoWidget(smooth=smooth)
         lay = QtWidgets.QVBoxLayout(self)
         lay.setContentsMargins(6, 6, 6, 6)
         lay.setSpacing(6)
@@ -85,16 +178,19 @@ class CameraTile(QtWidgets.QWidget):
         lay.addWidget(self.status)
         lay.addWidget(self.video, 1)
         self.setMinimumWidth(320)
-        self._last_seq: int = -1
+        # 上次设置的状态文本与录制态：仅在变化时调用 setText / setStyleSheet（后者会触发样式重算）
+        self._last_status_text: str = ""
+        self._last_rec: bool | None = None
 
     # FPS 不在 Qt 计算，Qt 仅显示 camera.get_status() 提供的数据
 
-    def refresh(self) -> None:
+    def refresh(self, mosaic_recording: bool = False) -> None:
+        """Redraw the tile; mosaic_recording shows REC while the tiled recorder is active."""
+        # 相机发布的是只读共享帧；VideoWidget 先按显示尺寸缩放，再转为 BGRA（Format_RGB32）上传
         seq, frame = self.cam.get_latest_frame_with_seq()
-        # 仅在出现新帧时才进行渲染与缩放，降低 CPU/GPU 压力
-        if frame is not None and seq != self._last_seq:
-            self._last_seq = seq
-            self.video.show_frame(frame)
+        # 仅在出现新帧或控件尺寸变化时才进行渲染与缩放（由 VideoWidget 按 (seq, size) 判断）
+        if frame is not None:
+            self.video.show_frame(frame, seq)
         # 从相机层获取状态（fps/size/recording）
         st = self.cam.get_status()
         # fps
@@ -117,15 +213,23 @@ class CameraTile(QtWidgets.QWidget):
                 w = tup[0]
                 h = tup[1]
         size_text = f"{w}x{h}" if (w is not None and h is not None) else "—"
-        rec = bool(st.get("recording", False))
+        cam_rec = bool(st.get("recording", False))
+        # 马赛克录制时各路相机自身不录制（无录制 FPS），但同样属于录制中
+        rec = cam_rec or mosaic_recording
         parts = [size_text]
-        if rec:
+        if cam_rec:
             parts.append(f"{fps:.1f} FPS")
         else:
             parts.append("— FPS")
         if rec:
             parts.append("REC")
-        self.status.setText("  |  ".join(parts))
+        text = "  |  ".join(parts)
+        if text != self._last_status_text:
+            self._last_status_text = text
+            self.status.setText(text)
+        if rec == self._last_rec:
+            return
+        self._last_rec = rec
         if rec:
             self.status.setStyleSheet(
                 "color: #e55; padding: 0 4px 4px 4px; font-weight: 600; font-size: 12px;"
@@ -156,13 +260,27 @@ class QtMultiCamApp(QtWidgets.QMainWindow):
         self.scrollArea.setWidget(container)
         self.setCentralWidget(self.scrollArea)
         # Create tiles for each camera
-        self.tiles: list[CameraTile] = [CameraTile(cam, self) for cam in self.core.cams]
+        smooth = self.core.cfg.smooth_preview
+        self.tiles: list[CameraTile] = [
+            CameraTile(cam, self, smooth=smooth) for cam in self.core.cams
+        ]
         self.card_min_w: int = 380
         self._relayout()
 
-        # Timer to refresh frames
+        # 帧到达驱动刷新：采集线程发布新帧后经 FrameBridge 排队通知 GUI 线程刷新对应 tile
+        self._tiles_by_id: dict[int, CameraTile] = {
+            t.cam.device_id: t for t in self.tiles
+        }
+        self.bridge: FrameBridge = FrameBridge(self)
+        _ = self.bridge.frame_ready.connect(  # type: ignore[arg-type]
+            self._on_frame, QtCore.Qt.ConnectionType.QueuedConnection
+        )
+        for cam in self.core.cams:
+            cam.on_frame = self.bridge.notify
+
+        # 低频兜底定时器：刷新状态文本，并在通知丢失时重新请求帧
         self.timer: QtCore.QTimer = QtCore.QTimer(self)
-        self.timer.setInterval(16)  # ~60 FPS
+        self.timer.setInterval(200)
         _ = self.timer.timeout.connect(self._on_tick)  # type: ignore[arg-type]
         self.timer.start()
 
@@ -184,10 +302,21 @@ class QtMultiCamApp(QtWidgets.QMainWindow):
         )
         _ = self._shortcut_esc.activated.connect(self.close)  # type: ignore[arg-type]
 
+    def _on_frame(self, device_id: int) -> None:
+        self.bridge.done(device_id)
+        tile = self._tiles_by_id.get(device_id)
+        if tile is None:
+            return
+        try:
+            tile.refresh(self.core.is_mosaic_recording())
+        except Exception as e:
+            logger.exception(f"UI refresh failed for camera {device_id}: {e}")
+
     def _on_tick(self) -> None:
         try:
+            mosaic_rec = self.core.is_mosaic_recording()
             for t in self.tiles:
-                t.refresh()
+                t.refresh(mosaic_rec)
         except Exception as e:
             logger.exception(f"UI tick failed: {e}")
 
@@ -221,9 +350,13 @@ class QtMultiCamApp(QtWidgets.QMainWindow):
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         try:
             self.timer.stop()
+            for cam in self.core.cams:
+                cam.on_frame = None
             self.core.stop_recording_all()
             for cam in self.core.cams:
                 cam.close()
+            if self.core.reactor is not None:
+                self.core.reactor.close()
         finally:
             super().closeEvent(event)
 